@@ -1,17 +1,34 @@
-import os
+import shutil
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# One session for the whole run so urllib3 reuses pooled connections to
+# api.inaturalist.org and the photo CDN instead of opening (and
+# TLS-handshaking) a new one per request.
+SESSION = requests.Session()
+SESSION.headers.update({'User-Agent': 'Mozilla/5.0'})
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.5)
+)
+SESSION.mount('http://', _adapter)
+SESSION.mount('https://', _adapter)
 
 def download_inaturalist_images(taxon_id, species_name, num_images=300):
-    per_page = 100 
+    per_page = 100
     page = 1
     downloaded = 0
-    headers = {'User-Agent': 'Mozilla/5.0'}
-    folder = species_name.replace(" ", "_")
-    os.makedirs(folder, exist_ok=True)
+    # Hoisted out of the download loop: this doesn't change per image.
+    folder_path = Path(species_name.replace(" ", "_"))
+    folder_path.mkdir(exist_ok=True)
 
     while downloaded < num_images:
         url = f"https://api.inaturalist.org/v1/observations?taxon_id={taxon_id}&per_page={per_page}&page={page}&order=desc&order_by=created_at"
-        response = requests.get(url, headers=headers)
+        response = SESSION.get(url)
         if response.status_code != 200:
             print(f"Failed to fetch data for {species_name}. Status code: {response.status_code}")
             break
@@ -27,15 +44,33 @@ def download_inaturalist_images(taxon_id, species_name, num_images=300):
                     break
                 url = photo.get('url')
                 if url:
-                   
-                    image_url = url.replace('square', 'original')
+                    # Photo IDs are globally unique in iNat, so naming by
+                    # ID (not the download counter) lets a restarted run
+                    # skip everything it already has.
+                    save_path = folder_path / f"{photo['id']}.jpg"
+                    if save_path.exists():
+                        downloaded += 1
+                        continue
+
+                    # 'large' (1024 px) is plenty for training and far
+                    # smaller on the wire than 'original'.
+                    image_url = url.replace('square', 'large')
+                    part_path = save_path.with_name(save_path.name + '.part')
                     try:
-                        img_data = requests.get(image_url, headers=headers).content
-                        with open(f"{folder}/{species_name.replace(' ', '')}{downloaded + 1}.jpg", 'wb') as handler:
-                            handler.write(img_data)
+                        # Stream straight to disk in 64 KB blocks instead of
+                        # buffering the whole image in memory via .content.
+                        # The body lands in a .part file renamed only on
+                        # success, so an interrupted transfer never leaves
+                        # a truncated file for the exists() check to skip.
+                        with SESSION.get(image_url, stream=True, timeout=30) as r:
+                            r.raise_for_status()
+                            with open(part_path, 'wb') as handler:
+                                shutil.copyfileobj(r.raw, handler, length=64 * 1024)
+                        part_path.rename(save_path)
                         downloaded += 1
                         print(f"Downloaded {downloaded} images for {species_name}")
                     except Exception as e:
+                        part_path.unlink(missing_ok=True)
                         print(f"Error downloading image: {e}")
         page += 1
 
@@ -48,5 +83,13 @@ species_list = [
    
 ]
 
-for species in species_list:
-    download_inaturalist_images(species['taxon_id'], species['name'])
\ No newline at end of file
+# Species scrapes are I/O-bound, so run them concurrently; the shared
+# pooled session is thread-safe for GETs.
+with ThreadPoolExecutor(max_workers=len(species_list)) as executor:
+    futures = [
+        executor.submit(download_inaturalist_images, species['taxon_id'], species['name'])
+        for species in species_list
+    ]
+    # Re-raise any worker exception instead of dropping it with the future.
+    for future in futures:
+        future.result()
\ No newline at end of file
@@ -1,5 +1,16 @@
+import hashlib
+import io
+import json
 import os
+import queue
+import re
+import shutil
+import sqlite3
+import tarfile
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from time import sleep
 from urllib.parse import quote
 from typing import List, Optional
@@ -7,6 +18,16 @@ import logging
 from pathlib import Path
 import math
 
+try:
+    import liburing  # optional, Linux-only io_uring bindings
+except ImportError:
+    liburing = None
+
+try:
+    import orjson  # optional, C JSON parser ~3-5x faster than stdlib
+except ImportError:
+    orjson = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -18,33 +39,294 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Compiled once instead of re-splitting every URL in the download loop.
+EXT_RE = re.compile(r'\.(jpe?g|png)$', re.I)
+
+class TokenBucket:
+    """Thread-safe token-bucket rate limiter on the monotonic clock.
+
+    Allows bursting up to `capacity` requests, refilling at
+    `capacity / interval` tokens per second — unlike a fixed per-request
+    sleep, idle time is never inserted while tokens remain.
+    """
+
+    def __init__(self, capacity: int, interval: float):
+        self.capacity = capacity
+        self.rate = capacity / interval
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then consume it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            sleep(wait)
+
+class ResponseCache:
+    """SQLite-backed memo of API responses with a TTL.
+
+    Iterative dataset-curation runs re-issue the same observation pages;
+    caching the JSON locally turns a rerun's dominant network cost into a
+    few metadata lookups.
+    """
+
+    def __init__(self, path: str = "inat_cache.sqlite", ttl_seconds: int = 24 * 3600):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, fetched_at REAL, body TEXT)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[dict]) -> str:
+        raw = url + json.dumps(params or {}, sort_keys=True)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fetched_at, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or time.time() - row[0] > self.ttl_seconds:
+            return None
+        return json.loads(row[1])
+
+    def put(self, key: str, data: dict) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                (key, time.time(), json.dumps(data))
+            )
+            self._db.commit()
+
+class DownloadIndex:
+    """SQLite sidecar recording ETag/Last-Modified per downloaded URL.
+
+    Lets download_image issue conditional GETs: when the server answers
+    304 Not Modified, a multi-MB transfer becomes a few hundred bytes,
+    even when the local filename scheme has changed since the last run.
+    """
+
+    def __init__(self, path: str = "downloads.db"):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS downloads "
+            "(url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, path TEXT)"
+        )
+        self._db.commit()
+
+    def get(self, url: str) -> Optional[tuple]:
+        """Return (etag, last_modified, path) for url, or None."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT etag, last_modified, path FROM downloads WHERE url = ?", (url,)
+            ).fetchone()
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str],
+            path: Path) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?)",
+                (url, etag, last_modified, str(path))
+            )
+            self._db.commit()
+
+class UringWriter:
+    """Background writer that batches image writes through io_uring.
+
+    Downloads hand (path, data) pairs to a queue; a single worker thread
+    drains it and submits up to BATCH_SIZE writes with one
+    io_uring_submit() call, amortizing syscall overhead across images.
+    Falls back to plain pwrite when liburing is unavailable (non-Linux or
+    not installed), and for single-item batches where io_uring buys
+    nothing.
+    """
+    BATCH_SIZE = 32
+    QUEUE_DEPTH = 64
+
+    def __init__(self):
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._ring = None
+        if liburing is not None:
+            try:
+                self._ring = liburing.io_uring()
+                liburing.io_uring_queue_init(self.QUEUE_DEPTH, self._ring, 0)
+            except Exception as e:
+                logger.warning(f"io_uring unavailable, using pwrite: {e}")
+                self._ring = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, path: Path, data: bytes) -> None:
+        """Queue an image buffer for writing to path."""
+        self._queue.put((path, data))
+
+    def close(self) -> None:
+        """Flush pending writes and stop the worker thread."""
+        self._queue.put(None)
+        self._thread.join()
+        if self._ring is not None:
+            liburing.io_uring_queue_exit(self._ring)
+
+    def _run(self) -> None:
+        done = False
+        while not done:
+            batch = [self._queue.get()]
+            # Opportunistically drain whatever else is already queued so
+            # one submission covers the whole batch.
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            if not batch:
+                continue
+            try:
+                if self._ring is not None and len(batch) > 1:
+                    try:
+                        self._write_batch_uring(batch)
+                    except Exception as e:
+                        # download_image already reported these images as
+                        # downloaded, so the buffers must reach disk: retry
+                        # the whole batch through plain pwrite.
+                        logger.warning(f"io_uring batch failed, retrying with pwrite: {e}")
+                        self._write_batch_posix(batch)
+                else:
+                    self._write_batch_posix(batch)
+            except Exception as e:
+                logger.error(f"Background write failed: {e}")
+
+    def _write_batch_posix(self, batch: list) -> None:
+        for path, data in batch:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                os.pwrite(fd, data, 0)
+            finally:
+                os.close(fd)
+            logger.info(f"Downloaded: {path}")
+
+    def _write_batch_uring(self, batch: list) -> None:
+        fds = []
+        failed = []
+        try:
+            for idx, (path, data) in enumerate(batch):
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                fds.append(fd)
+                sqe = liburing.io_uring_get_sqe(self._ring)
+                liburing.io_uring_prep_write(sqe, fd, data, len(data), 0)
+                sqe.user_data = idx
+            # One kernel entry for the whole batch.
+            liburing.io_uring_submit(self._ring)
+            cqe = liburing.io_uring_cqe()
+            for _ in batch:
+                liburing.io_uring_wait_cqe(self._ring, cqe)
+                path, data = batch[cqe.user_data]
+                # The file was opened with O_TRUNC, so a failed (ENOSPC,
+                # EIO) or short completion leaves a truncated file that
+                # later exists()/ETag checks would trust; those entries
+                # must be rewritten.
+                if cqe.res != len(data):
+                    logger.warning(
+                        f"io_uring write incomplete for {path} (res {cqe.res}); retrying with pwrite")
+                    failed.append((path, data))
+                else:
+                    logger.info(f"Downloaded: {path}")
+                liburing.io_uring_cqe_seen(self._ring, cqe)
+        finally:
+            for fd in fds:
+                os.close(fd)
+        if failed:
+            self._write_batch_posix(failed)
+
 class INaturalistScraper:
     BASE_URL = "https://api.inaturalist.org/v1/observations"
-    REQUEST_DELAY = 1.5  # seconds between requests to be polite to the API
+    # iNaturalist allows 100 req/min; burst up to 90/min instead of pacing
+    # every request. Image CDN fetches don't count against the API quota.
+    API_RATE_LIMIT = (90, 60.0)
     MAX_RETRIES = 3
     TIMEOUT = 30  # seconds
     TARGET_IMAGES_PER_SPECIES = 250
-    PER_PAGE = 30  # Max allowed by iNaturalist API
+    PER_PAGE = 200  # Max allowed by the iNaturalist observations API
+    DOWNLOAD_WORKERS = 16  # concurrent image fetches per page; polite to the CDN
     
-    def __init__(self, output_dir: str = "dataset"):
+    def __init__(self, output_dir: str = "dataset", use_uring_writer: bool = False,
+                 output_format: str = "files", size: str = "large"):
+        # `size` picks the photo resolution fetched from the CDN. 'large'
+        # (1024 px) is plenty for training pipelines that resize anyway
+        # and is 5-20x smaller on the wire than 'original'; only pick
+        # 'original' for high-detail work.
+        if output_format not in ("files", "tar"):
+            raise ValueError(f"Unsupported output_format: {output_format}")
+        if size not in ("small", "medium", "large", "original"):
+            raise ValueError(f"Unsupported photo size: {size}")
         self.output_dir = output_dir
-        self.session = requests.Session()
-        self.session.headers.update({
-            "User-Agent": "iNaturalistImageScraper/1.0 (https://github.com/yourusername)",
-            "Accept": "application/json"
-        })
-        
+        self.output_format = output_format
+        self.size = size
+        self._local = threading.local()
+        self.writer = UringWriter() if use_uring_writer else None
+        self.cache = ResponseCache()
+        self.downloads = DownloadIndex()
+        self.rate_limiter = TokenBucket(*self.API_RATE_LIMIT)
+
+    @property
+    def session(self) -> requests.Session:
+        """Per-thread Session so concurrent species scrapes don't share
+        connection state."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({
+                "User-Agent": "iNaturalistImageScraper/1.0 (https://github.com/yourusername)",
+                "Accept": "application/json"
+            })
+            self._local.session = session
+        return session
+
+    def close(self) -> None:
+        """Flush the background writer, if one is in use."""
+        if self.writer is not None:
+            self.writer.close()
+
     def _make_request(self, url: str, params: Optional[dict] = None) -> Optional[dict]:
-        """Make an API request with retries and error handling."""
+        """Make an API request with retries, error handling and caching."""
+        cache_key = ResponseCache.make_key(url, params)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Cache hit for {url}")
+            return cached
+
         for attempt in range(self.MAX_RETRIES):
             try:
+                self.rate_limiter.acquire()
                 response = self.session.get(
                     url,
                     params=params,
                     timeout=self.TIMEOUT
                 )
                 response.raise_for_status()
-                return response.json()
+                # Parsing a page of nested observations isn't free and
+                # happens on the thread that issues the next GET.
+                if orjson is not None:
+                    data = orjson.loads(response.content)
+                else:
+                    data = response.json()
+                self.cache.put(cache_key, data)
+                return data
             except requests.exceptions.RequestException as e:
                 logger.warning(f"Attempt {attempt + 1} failed for {url}: {str(e)}")
                 if attempt < self.MAX_RETRIES - 1:
@@ -60,77 +342,195 @@ class INaturalistScraper:
         return taxon_dir
     
     def download_image(self, url: str, save_path: Path) -> bool:
-        """Download and save an image from a URL."""
+        """Download and save an image from a URL.
+
+        Sends a conditional GET when the URL was fetched before; a 304
+        answer means the previously saved copy is still current.
+        """
         try:
+            headers = {}
+            cached_path = None
+            known = self.downloads.get(url)
+            if known is not None:
+                etag, last_modified, old_path = known
+                # Only go conditional while the recorded copy is still on
+                # disk; if it has been deleted, re-fetch unconditionally
+                # rather than risk a bodyless 304.
+                if Path(old_path).exists():
+                    cached_path = old_path
+                    if etag:
+                        headers['If-None-Match'] = etag
+                    if last_modified:
+                        headers['If-Modified-Since'] = last_modified
+
             response = self.session.get(
                 url,
                 stream=True,
-                timeout=self.TIMEOUT
+                timeout=self.TIMEOUT,
+                headers=headers
             )
+            if response.status_code == 304 and cached_path is not None:
+                # The caller only asks for paths that don't exist yet, so
+                # a 304 means the image lives under an old filename scheme
+                # or output dir. Materialize it at the new location — the
+                # cheap local copy is what the 304 bought us.
+                if Path(cached_path) != save_path:
+                    try:
+                        os.link(cached_path, save_path)
+                    except OSError:
+                        shutil.copyfile(cached_path, save_path)
+                    self.downloads.put(url, etag, last_modified, save_path)
+                logger.info(f"Not modified, reused local copy: {save_path}")
+                return True
             response.raise_for_status()
-            
-            with save_path.open('wb') as f:
-                for chunk in response.iter_content(8192):
+
+            if self.writer is not None:
+                # Hand the buffered body to the background writer so disk
+                # writes are batched across images.
+                self.writer.submit(save_path, response.content)
+                self.downloads.put(url, response.headers.get('ETag'),
+                                   response.headers.get('Last-Modified'), save_path)
+                return True
+
+            # Large chunks plus a 1 MB write buffer keep the per-image
+            # syscall count low (one ~1 MB write() instead of hundreds of
+            # 8 KB ones).
+            with open(save_path, 'wb', buffering=1 << 20) as f:
+                for chunk in response.iter_content(64 * 1024):
                     f.write(chunk)
-            
+
+            self.downloads.put(url, response.headers.get('ETag'),
+                               response.headers.get('Last-Modified'), save_path)
             logger.info(f"Downloaded: {save_path}")
             return True
         except Exception as e:
             logger.error(f"Failed to download {url}: {str(e)}")
             return False
-    
+
+    def _download_bytes(self, url: str) -> Optional[bytes]:
+        """Download an image and return its bytes, or None on failure."""
+        try:
+            response = self.session.get(url, timeout=self.TIMEOUT)
+            response.raise_for_status()
+            return response.content
+        except Exception as e:
+            logger.error(f"Failed to download {url}: {str(e)}")
+            return None
+
     def scrape_taxon(self, taxon_name: str) -> None:
         """Scrape research-grade observations for a given taxon."""
         logger.info(f"Starting scrape for {taxon_name}")
         
         taxon_dir = self._ensure_output_dir(taxon_name)
+
+        archive = None
+        if self.output_format == "tar":
+            # One tar per species: a single sequentially-written file
+            # instead of hundreds of inodes, and sequential reads for
+            # downstream training. Append on rerun — plain tar supports
+            # it — so a previous run's images aren't truncated away.
+            archive_path = taxon_dir / f"{taxon_name.replace(' ', '_')}.tar"
+            archive = tarfile.open(archive_path, "a" if archive_path.exists() else "w")
+
+        try:
+            self._scrape_taxon_pages(taxon_name, taxon_dir, archive)
+        finally:
+            if archive is not None:
+                archive.close()
+
+    def _scrape_taxon_pages(self, taxon_name: str, taxon_dir: Path,
+                            archive: Optional[tarfile.TarFile]) -> None:
+        """Walk observation pages for a taxon and download their photos."""
         total_downloaded = 0
         page = 1
         max_pages = math.ceil(self.TARGET_IMAGES_PER_SPECIES / self.PER_PAGE)
-        
+
+        # Observation IDs already downloaded (files are named <id>_<n>.<ext>).
+        # Checking this set up front skips reruns and observations that
+        # pagination re-emits, before any HTTP GET is issued.
+        seen_ids = {p.stem.split('_')[0] for p in taxon_dir.iterdir() if p.is_file()}
+        if archive is not None:
+            # Archive members use the same <id>_<n>.<ext> naming, so a
+            # reopened tar's contents count as already downloaded too.
+            seen_ids.update(name.split('_')[0] for name in archive.getnames())
+
+        # Cursor pagination: offset-based `page` makes the server skip
+        # page * per_page rows, so deep pages get slower and slower.
+        # Walking ids downward with `id_below` is O(1) server-side.
+        last_id_seen = None
+
         while total_downloaded < self.TARGET_IMAGES_PER_SPECIES:
             logger.info(f"Processing page {page} (Downloaded {total_downloaded}/{self.TARGET_IMAGES_PER_SPECIES})")
-            
+
             params = {
                 'taxon_name': taxon_name,
                 'quality_grade': 'research',
                 'photos': 'true',
                 'per_page': self.PER_PAGE,
-                'page': page,
                 'order': 'desc',
-                'order_by': 'created_at'
+                'order_by': 'id'
             }
-            
+            if last_id_seen is not None:
+                params['id_below'] = last_id_seen
+
             data = self._make_request(self.BASE_URL, params)
             if not data or 'results' not in data or not data['results']:
                 logger.warning(f"No more results found for {taxon_name}")
                 break
-            
+
+            last_id_seen = min(result['id'] for result in data['results'])
+
+            # Collect the page's downloads first, then run them on a
+            # bounded thread pool so the network waits overlap.
+            tasks = []  # (image_url, filename, save_path)
             for result in data['results']:
+                if str(result['id']) in seen_ids:
+                    logger.debug(f"Skipping already-downloaded observation {result['id']}")
+                    continue
+                seen_ids.add(str(result['id']))
+
                 if not result.get('photos'):
                     continue
-                    
+
                 for i, photo in enumerate(result['photos'], 1):
-                    if total_downloaded >= self.TARGET_IMAGES_PER_SPECIES:
+                    if total_downloaded + len(tasks) >= self.TARGET_IMAGES_PER_SPECIES:
                         break
-                        
-                    # Get the best available image URL
-                    image_url = photo['url'].replace("square", "original")
-                    ext = image_url.split('.')[-1].lower()
-                    if ext not in ['jpg', 'jpeg', 'png']:
-                        ext = 'jpg'
-                        
+
+                    image_url = photo['url'].replace("square", self.size)
+                    match = EXT_RE.search(image_url)
+                    ext = match.group(1).lower() if match else 'jpg'
+
                     filename = f"{result['id']}_{i}.{ext}"
                     save_path = taxon_dir / filename
-                    
-                    if save_path.exists():
+
+                    if archive is None and save_path.exists():
                         logger.debug(f"Skipping existing file: {save_path}")
                         continue
-                        
-                    if self.download_image(image_url, save_path):
-                        total_downloaded += 1
-                        sleep(self.REQUEST_DELAY)
-            
+
+                    tasks.append((image_url, filename, save_path))
+
+            if tasks:
+                with ThreadPoolExecutor(max_workers=self.DOWNLOAD_WORKERS) as pool:
+                    if archive is not None:
+                        # tarfile isn't thread-safe: fetch concurrently,
+                        # append to the archive as results complete.
+                        futures = {pool.submit(self._download_bytes, url): filename
+                                   for url, filename, _ in tasks}
+                        for future in as_completed(futures):
+                            buf = future.result()
+                            if buf is not None:
+                                info = tarfile.TarInfo(name=futures[future])
+                                info.size = len(buf)
+                                archive.addfile(info, io.BytesIO(buf))
+                                logger.info(f"Archived: {futures[future]}")
+                                total_downloaded += 1
+                    else:
+                        futures = [pool.submit(self.download_image, url, save_path)
+                                   for url, _, save_path in tasks]
+                        for future in as_completed(futures):
+                            if future.result():
+                                total_downloaded += 1
+
             page += 1
             
             # Safety check to prevent infinite loops
@@ -150,15 +550,20 @@ def main():
     
     # Initialize scraper
     scraper = INaturalistScraper(output_dir="inat_images")
-    
-    # Process each species
-    for species in species_list:
+
+    def process_species(species: str) -> None:
         try:
             logger.info(f"\n{'='*50}\nProcessing species: {species}\n{'='*50}")
             scraper.scrape_taxon(species)
         except Exception as e:
             logger.error(f"Error processing {species}: {str(e)}", exc_info=True)
-            continue
+
+    # Each species scrape is almost entirely I/O wait, so running them on
+    # threads overlaps their network time for a near-linear speedup.
+    with ThreadPoolExecutor(max_workers=len(species_list)) as executor:
+        list(executor.map(process_species, species_list))
+
+    scraper.close()
 
 if __name__ == "__main__":
     main()